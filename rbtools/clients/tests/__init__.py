@@ -2,20 +2,69 @@
 
 from __future__ import unicode_literals
 
+import atexit
 import os
+import shutil
+import tempfile
 
 from rbtools.tests import OptionsStub
 from rbtools.utils.testbase import RBTestBase
 
 
+#: The RAM-backed directory to place temporary files in, if available.
+SHM_DIR = '/dev/shm'
+
+_shm_tempdir = None
+
+
+def _get_shm_tempdir():
+    """Return a RAM-backed directory for temporary files.
+
+    The client tests do a lot of repository I/O, which is faster on a tmpfs.
+    The directory is created once per process and removed on exit.
+
+    If :envvar:`TMPDIR` is set, it's respected and no directory is used.
+
+    Returns:
+        unicode:
+        The path to the directory, or ``None`` if one isn't available.
+    """
+    global _shm_tempdir
+
+    if (_shm_tempdir is None and
+        not os.environ.get('TMPDIR') and
+        os.path.isdir(SHM_DIR) and
+        os.access(SHM_DIR, os.W_OK)):
+        try:
+            _shm_tempdir = tempfile.mkdtemp(prefix='rbtools-tests.',
+                                            dir=SHM_DIR)
+        except (IOError, OSError):
+            _shm_tempdir = ''
+        else:
+            atexit.register(shutil.rmtree, _shm_tempdir, True)
+
+    return _shm_tempdir or None
+
+
 class SCMClientTests(RBTestBase):
     """Base class for RBTools client unit tests."""
 
+    #: The directory containing the test repositories and home directory.
+    testdata_dir = os.path.join(os.path.dirname(__file__), 'testdata')
+
     def setUp(self):
+        # This is swapped in before anything else creates temporary files,
+        # and restored with a cleanup so that it's undone even if the rest of
+        # setup fails or the test is skipped.
+        shm_tempdir = _get_shm_tempdir()
+
+        if shm_tempdir:
+            self.addCleanup(setattr, tempfile, 'tempdir', tempfile.tempdir)
+            tempfile.tempdir = shm_tempdir
+
         super(SCMClientTests, self).setUp()
 
         self.options = OptionsStub()
-        self.testdata_dir = os.path.join(os.path.dirname(__file__), 'testdata')
 
 
 FOO = b"""\
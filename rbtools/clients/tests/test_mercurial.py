@@ -2,13 +2,17 @@
 
 from __future__ import unicode_literals
 
+import logging
 import os
 import re
 import shutil
+import socket
+import struct
+import subprocess
 import tempfile
 import time
+from binascii import unhexlify
 from hashlib import md5
-from random import randint
 from textwrap import dedent
 
 from kgb import SpyAgency
@@ -19,21 +23,312 @@ from rbtools.clients import RepositoryInfo
 from rbtools.clients.errors import CreateCommitError, MergeError
 from rbtools.clients.mercurial import MercurialClient, MercurialRefType
 from rbtools.clients.tests import (FOO, FOO1, FOO2, FOO3, FOO4, FOO5, FOO6,
-                                   SCMClientTests)
-from rbtools.utils.encoding import force_unicode
-from rbtools.utils.filesystem import is_exe_in_path, load_config
+                                   SCMClientTests, _get_shm_tempdir)
+from rbtools.utils.encoding import force_bytes, force_unicode
+from rbtools.utils.filesystem import (is_exe_in_path, load_config,
+                                      make_tempdir)
 from rbtools.utils.process import execute
 
 
+try:
+    # The digests are only used as fingerprints. Flagging that lets them
+    # work on FIPS-enabled builds of Python 3.9+.
+    md5(b'', usedforsecurity=False)
+    _md5_kwargs = {'usedforsecurity': False}
+except TypeError:
+    _md5_kwargs = {}
+
+
+def _diff_md5(diff):
+    """Return the MD5 digest of a diff.
+
+    Args:
+        diff (bytes):
+            The diff to fingerprint.
+
+    Returns:
+        bytes:
+        The raw MD5 digest.
+    """
+    return md5(diff, **_md5_kwargs).digest()
+
+
+def _write_file(filename, data):
+    """Write data to a file, replacing any existing content.
+
+    This writes directly to the file descriptor, bypassing Python's buffered
+    file objects, which only add overhead for the small files written in
+    these tests.
+
+    Args:
+        filename (unicode):
+            The name of the file to write.
+
+        data (bytes):
+            The data to write.
+    """
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _copy_hg_clone(src, dest):
+    """Copy a Mercurial clone, hardlinking its store where possible.
+
+    Mercurial breaks hardlinks before writing to a file (this is how it
+    shares stores between local clones), so the files in :file:`.hg/store`
+    can safely be linked instead of copied. Everything else may be written
+    to in place by tests, so it's always copied.
+
+    Args:
+        src (unicode):
+            The path to the clone to copy.
+
+        dest (unicode):
+            The path to copy the clone to. This must not exist.
+    """
+    store_dir = os.path.join('.hg', 'store')
+    link = getattr(os, 'link', None)
+
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel_dirpath = os.path.relpath(dirpath, src)
+        dest_dirpath = os.path.normpath(os.path.join(dest, rel_dirpath))
+        os.mkdir(dest_dirpath)
+
+        in_store = (rel_dirpath == store_dir or
+                    rel_dirpath.startswith(store_dir + os.sep))
+
+        for filename in filenames:
+            src_path = os.path.join(dirpath, filename)
+            dest_path = os.path.join(dest_dirpath, filename)
+
+            if in_store and link is not None:
+                try:
+                    link(src_path, dest_path)
+                    continue
+                except OSError as e:
+                    # The link failed (for instance, with EXDEV when the
+                    # paths are on different filesystems). Any other link
+                    # would fail the same way, so copy the rest of the store.
+                    logging.debug('Unable to hardlink %s to %s, so copying '
+                                  'the Mercurial store instead: %s',
+                                  src_path, dest_path, e)
+                    link = None
+
+            shutil.copy2(src_path, dest_path)
+
+
+_exe_in_path_cache = {}
+
+
+def _is_exe_in_path(name):
+    """Return whether an executable is in the path, caching the result.
+
+    Args:
+        name (unicode):
+            The name of the executable.
+
+    Returns:
+        bool:
+        Whether the executable was found.
+    """
+    try:
+        return _exe_in_path_cache[name]
+    except KeyError:
+        result = is_exe_in_path(name)
+        _exe_in_path_cache[name] = result
+
+        return result
+
+
+class _HgCmdServer(object):
+    """A client for a persistent Mercurial command server.
+
+    Spawning :program:`hg` for every command means paying Python's startup
+    cost each time. The command server (``hg serve --cmdserver pipe``) keeps
+    a single interpreter running, and commands are sent to it over a pipe
+    using Mercurial's framed channel protocol.
+    """
+
+    def __init__(self, cwd, env):
+        """Initialize and launch the command server.
+
+        Args:
+            cwd (unicode):
+                The directory to run the server (and all commands) in.
+
+            env (dict):
+                Environment variables to add to the server's environment.
+        """
+        new_env = os.environ.copy()
+        new_env.update(env)
+        new_env['LC_ALL'] = 'en_US.UTF-8'
+        new_env['LANGUAGE'] = 'en_US.UTF-8'
+
+        self.cwd = cwd
+        self.env = env
+        self._process = subprocess.Popen(
+            ['hg', 'serve', '--cmdserver', 'pipe'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            close_fds=True,
+            cwd=cwd,
+            env=new_env)
+
+        # The server always starts by sending a hello message on the output
+        # channel, listing its capabilities.
+        channel, data = self._read_channel()
+
+        if channel != b'o' or b'runcommand' not in data:
+            self.close()
+            raise Exception('Unexpected hello from hg command server: %r'
+                            % data)
+
+    def runcommand(self, command, ignore_errors=False,
+                   extra_ignore_errors=()):
+        """Run a Mercurial command on the server.
+
+        Args:
+            command (list of unicode):
+                The command and arguments to run.
+
+            ignore_errors (bool, optional):
+                Whether to ignore a non-zero return code.
+
+            extra_ignore_errors (tuple, optional):
+                Specific non-zero return codes to ignore.
+
+        Returns:
+            bytes:
+            The combined output and error streams of the command.
+
+        Raises:
+            Exception:
+                The command failed.
+        """
+        args = b'\0'.join(force_bytes(arg) for arg in command)
+        stdin = self._process.stdin
+        stdin.write(b'runcommand\n')
+        stdin.write(struct.pack(b'>I', len(args)))
+        stdin.write(args)
+        stdin.flush()
+
+        output = []
+
+        while True:
+            channel, data = self._read_channel()
+
+            if channel in (b'o', b'e'):
+                output.append(data)
+            elif channel == b'r':
+                rc = struct.unpack(b'>i', data)[0]
+                break
+            elif channel in (b'I', b'L'):
+                # The command wants input. Tests never provide any, so
+                # signal EOF.
+                stdin.write(struct.pack(b'>I', 0))
+                stdin.flush()
+            elif channel.isupper():
+                raise Exception('Unexpected required channel %r from hg '
+                                'command server' % channel)
+
+        output = b''.join(output)
+
+        if rc and not ignore_errors and rc not in extra_ignore_errors:
+            logging.debug('Command exited with rc %s: %s\n%s---',
+                          rc, command, output)
+            raise Exception('Failed to execute command: %s' % command)
+
+        return output
+
+    def close(self):
+        """Shut down the command server."""
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def _read_channel(self):
+        """Read a single framed message from the server.
+
+        Input channels (``I`` and ``L``) carry a requested length instead of
+        data, which is returned as-is.
+
+        Returns:
+            tuple:
+            A 2-tuple of the channel identifier and its data.
+        """
+        stdout = self._process.stdout
+        header = stdout.read(5)
+
+        if len(header) < 5:
+            raise Exception('hg command server closed unexpectedly')
+
+        channel = header[:1]
+        length = struct.unpack(b'>I', header[1:])[0]
+
+        if channel in (b'I', b'L'):
+            return channel, length
+
+        return channel, stdout.read(length)
+
+
 class MercurialTestBase(SCMClientTests):
     """Base class for all Mercurial unit tests."""
 
+    #: Commands run through run_hg that can change the working directory's
+    #: parent revision, invalidating the cached tip.
+    TIP_CHANGING_COMMANDS = {
+        'branch',
+        'commit',
+        'merge',
+        'pull',
+        'rebase',
+        'strip',
+        'tag',
+        'update',
+    }
+
+    #: Keyword arguments to run_hg that the command server supports.
+    _HG_CMDSERVER_KWARGS = {
+        'extra_ignore_errors',
+        'ignore_errors',
+    }
+
+    _COMMITTED_CHANGESET_RE = re.compile(
+        br'^committed changeset \d+:([0-9a-f]+)$', re.M)
+
     #: Environment variables to use by default when calling Mercurial.
     hg_env = {}
 
+    #: Environment variables to use when ``hg_env`` is empty.
+    default_hg_env = {
+        'HGRCPATH': os.devnull,
+        'HGPLAIN': '1',
+    }
+
+    def setUp(self):
+        super(MercurialTestBase, self).setUp()
+
+        self._hg_cmdserver = None
+        self._hg_tip = None
+
+        # A subclass's setUp() may start the command server and then fail or
+        # skip the test, in which case tearDown() is never called.
+        self.addCleanup(self._close_hg_cmdserver)
+
     def run_hg(self, command, **kwargs):
         """Run a Mercurial command.
 
+        Unless extra arguments other than ``ignore_errors`` and
+        ``extra_ignore_errors`` are given, the command is dispatched to a
+        persistent command server for the current directory and environment,
+        rather than spawning a new :program:`hg` process.
+
         Args:
             command (list of unicode):
                 The command and arguments to pass to :program:`hg`.
@@ -46,16 +341,27 @@ class MercurialTestBase(SCMClientTests):
             object:
             The result of :py:func:`~rbtools.utils.process.execute`.
         """
+        if command and command[0] in self.TIP_CHANGING_COMMANDS:
+            self._hg_tip = None
+
         # We're *not* doing `env = env or {}` here because we want the caller
         # to be able to enable reading of user and system-level hgrc
         # configuration.
         env = self.hg_env.copy()
 
         if not env:
-            env = {
-                'HGRCPATH': os.devnull,
-                'HGPLAIN': '1',
-            }
+            env = self.default_hg_env
+
+        if not set(kwargs) - self._HG_CMDSERVER_KWARGS:
+            cwd = os.getcwd()
+
+            if (self._hg_cmdserver is None or
+                self._hg_cmdserver.cwd != cwd or
+                self._hg_cmdserver.env != env):
+                self._close_hg_cmdserver()
+                self._hg_cmdserver = _HgCmdServer(cwd, env)
+
+            return self._hg_cmdserver.runcommand(command, **kwargs)
 
         return execute(['hg'] + command,
                        env,
@@ -90,19 +396,51 @@ class MercurialTestBase(SCMClientTests):
                 The optional tag to create.
         """
         if branch:
-            self.run_hg(['branch', branch])
+            # This is equivalent to `hg branch`, which just records the
+            # branch for the next commit in .hg/branch.
+            _write_file(os.path.join(self.clone_dir, '.hg', 'branch'),
+                        force_bytes('%s\n' % branch))
 
         if bookmark:
             self.run_hg(['bookmark', bookmark])
 
-        with open(filename, 'wb') as f:
-            f.write(data)
+        _write_file(filename, data)
+
+        output = self.run_hg(['commit', '--debug', '-A', '-m', msg,
+                              filename])
 
-        self.run_hg(['commit', '-A', '-m', msg, filename])
+        # The new changeset is now the working directory's parent, so cache
+        # it rather than asking for it again in _hg_get_tip.
+        m = self._COMMITTED_CHANGESET_RE.search(output)
+
+        if m:
+            self._hg_tip = force_unicode(m.group(1)[:12])
 
         if tag:
             self.run_hg(['tag', tag])
 
+    def _hg_get_tip(self):
+        """Return the revision at the tip of the branch.
+
+        The result is cached until the next call to :py:meth:`run_hg` that
+        may change it. Changes made by :py:class:`MercurialClient` itself are
+        not tracked.
+
+        Returns:
+            unicode:
+            The tip revision.
+        """
+        if self._hg_tip is None:
+            self._hg_tip = force_unicode(self.run_hg(['identify']).split()[0])
+
+        return self._hg_tip
+
+    def _close_hg_cmdserver(self):
+        """Shut down the command server, if one is running."""
+        if self._hg_cmdserver is not None:
+            self._hg_cmdserver.close()
+            self._hg_cmdserver = None
+
 
 class MercurialClientTests(SpyAgency, MercurialTestBase):
     """Unit tests for MercurialClient."""
@@ -123,6 +461,13 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
         git = true
     """).rstrip()
 
+    #: MD5 digests of the diffs generated in the tests.
+    DIFF_FOO1_MD5 = unhexlify(b'68c2bdccf52a4f0baddd0ac9f2ecb7d2')
+    DIFF_FOO3_MD5 = unhexlify(b'9c8796936646be5c7349973b0fceacbd')
+    DIFF_DIVERGED_FOO2_MD5 = unhexlify(b'6b12723baab97f346aa938005bc4da4d')
+    DIFF_FOO2_FOO3_MD5 = unhexlify(b'7a897f68a9dc034fc1e42fe7a33bb808')
+    PARENT_DIFF_FOO2_MD5 = unhexlify(b'5cacbd79800a9145f982dcc0908b6068')
+
     AUTHOR = type(
         str('Author'),
         (object,),
@@ -131,28 +476,78 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
             'email': 'email',
         })
 
-    def setUp(self):
-        super(MercurialClientTests, self).setUp()
+    @classmethod
+    def setUpClass(cls):
+        super(MercurialClientTests, cls).setUpClass()
 
-        if not is_exe_in_path('hg'):
+        if not _is_exe_in_path('hg'):
             raise SkipTest('hg not found in path')
 
-        self.hg_dir = os.path.join(self.testdata_dir, 'hg-repo')
-        self.clone_dir = self.chdir_tmp()
+        cls.hg_dir = os.path.join(cls.testdata_dir, 'hg-repo')
+
+        # Clone the repository once, and give each test its own copy of the
+        # clone. The template goes on the same filesystem as the per-test
+        # temp directories, so that the copies can hardlink its store.
+        cls._template_temp_dir = tempfile.mkdtemp(prefix='rbtools.',
+                                                  dir=_get_shm_tempdir())
+        cls._template_clone_dir = os.path.join(cls._template_temp_dir,
+                                               'hg-clone')
+        execute(['hg', 'clone', '--stream', cls.hg_dir,
+                 cls._template_clone_dir],
+                cls.default_hg_env)
+
+        # Only the clone directory differs between tests, so render the rest
+        # of the hgrc once.
+        cls._clone_hgrc = force_bytes(cls.CLONE_HGRC % {
+            'hg_dir': cls.hg_dir,
+            'clone_dir': '{clone_dir}',
+            'test_server': cls.TESTSERVER,
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._template_temp_dir, ignore_errors=True)
+
+        super(MercurialClientTests, cls).tearDownClass()
+
+    def setUp(self):
+        super(MercurialClientTests, self).setUp()
+
+        self.clone_dir = os.path.join(make_tempdir(), 'hg-clone')
         self.clone_hgrc_path = os.path.join(self.clone_dir, '.hg', 'hgrc')
 
-        self.run_hg(['clone', '--stream', self.hg_dir, self.clone_dir])
+        _copy_hg_clone(self._template_clone_dir, self.clone_dir)
+        os.chdir(self.clone_dir)
         self.client = MercurialClient(options=self.options)
 
-        with open(self.clone_hgrc_path, 'w') as fp:
-            fp.write(self.CLONE_HGRC % {
-                'hg_dir': self.hg_dir,
-                'clone_dir': self.clone_dir,
-                'test_server': self.TESTSERVER,
-            })
+        _write_file(self.clone_hgrc_path,
+                    self._clone_hgrc.replace(b'{clone_dir}',
+                                             force_bytes(self.clone_dir)))
 
         self.options.parent_branch = None
 
+    def test_setup_hardlinks_store(self):
+        """Testing MercurialClientTests setup hardlinking the clone's store
+        files to the template clone
+        """
+        if not hasattr(os, 'link'):
+            raise SkipTest('Hardlinks are not supported on this platform.')
+
+        store_dir = os.path.join(self.clone_dir, '.hg', 'store')
+        store_files = [
+            os.path.join(dirpath, filename)
+            for dirpath, dirnames, filenames in os.walk(store_dir)
+            for filename in filenames
+        ]
+
+        self.assertTrue(store_files)
+        self.assertTrue(any(os.path.dirname(path) != store_dir
+                            for path in store_files))
+
+        for path in store_files:
+            self.assertGreater(os.stat(path).st_nlink, 1,
+                               '%s is not hardlinked' % path)
+
     def test_get_repository_info(self):
         """Testing MercurialClient.get_repository_info"""
         ri = self.client.get_repository_info()
@@ -207,8 +602,8 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '68c2bdccf52a4f0baddd0ac9f2ecb7d2')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO1_MD5)
 
     def test_diff_with_multiple(self):
         """Testing MercurialClient.diff with multiple commits"""
@@ -227,8 +622,8 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '9c8796936646be5c7349973b0fceacbd')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO3_MD5)
 
     def test_diff_with_exclude_patterns(self):
         """Testing MercurialClient.diff with exclude_patterns"""
@@ -244,8 +639,8 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '68c2bdccf52a4f0baddd0ac9f2ecb7d2')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO1_MD5)
 
     def test_diff_with_exclude_patterns_no_matches(self):
         """Testing MercurialClient.diff with exclude_patterns and no matched
@@ -263,8 +658,8 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(revisions, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '68c2bdccf52a4f0baddd0ac9f2ecb7d2')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO1_MD5)
 
     def test_diff_with_diverged_branch(self):
         """Testing MercurialClient.diff with diverged branch"""
@@ -282,8 +677,8 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '6b12723baab97f346aa938005bc4da4d')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_DIVERGED_FOO2_MD5)
 
         self.run_hg(['update', '-C', 'default'])
 
@@ -292,8 +687,8 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '68c2bdccf52a4f0baddd0ac9f2ecb7d2')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO1_MD5)
 
     def test_diff_with_parent_diff(self):
         """Testing MercurialClient.diff with parent diffs"""
@@ -312,10 +707,10 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('parent_diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '7a897f68a9dc034fc1e42fe7a33bb808')
-        self.assertEqual(md5(result['parent_diff']).hexdigest(),
-                         '5cacbd79800a9145f982dcc0908b6068')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO2_FOO3_MD5)
+        self.assertEqual(_diff_md5(result['parent_diff']),
+                         self.PARENT_DIFF_FOO2_MD5)
 
     def test_diff_with_parent_diff_and_diverged_branch(self):
         """Testing MercurialClient.diff with parent diffs and diverged branch
@@ -337,10 +732,10 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
         result = self.client.diff(revisions)
 
         self.assertIn('parent_diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '7a897f68a9dc034fc1e42fe7a33bb808')
-        self.assertEqual(md5(result['parent_diff']).hexdigest(),
-                         '5cacbd79800a9145f982dcc0908b6068')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO2_FOO3_MD5)
+        self.assertEqual(_diff_md5(result['parent_diff']),
+                         self.PARENT_DIFF_FOO2_MD5)
 
     def test_diff_with_parent_diff_using_option(self):
         """Testing MercurialClient.diff with parent diffs using --parent"""
@@ -363,10 +758,10 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('parent_diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '7a897f68a9dc034fc1e42fe7a33bb808')
-        self.assertEqual(md5(result['parent_diff']).hexdigest(),
-                         '5cacbd79800a9145f982dcc0908b6068')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO2_FOO3_MD5)
+        self.assertEqual(_diff_md5(result['parent_diff']),
+                         self.PARENT_DIFF_FOO2_MD5)
 
     def test_parse_revision_spec_with_no_args(self):
         """Testing MercurialClient.parse_revision_spec with no arguments"""
@@ -862,22 +1257,21 @@ class MercurialClientTests(SpyAgency, MercurialTestBase):
                               message='commit message',
                               author=self.AUTHOR)
 
-    def _hg_get_tip(self):
-        """Return the revision at the tip of the branch.
-
-        Returns:
-            unicode:
-            The tip revision.
-        """
-        return force_unicode(self.run_hg(['identify']).split()[0])
-
 
 class MercurialSubversionClientTests(MercurialTestBase):
     """Unit tests for hgsubversion."""
 
     TESTSERVER = 'http://127.0.0.1:8080'
 
-    SVNSERVE_MAX_RETRIES = 12
+    SVNSERVE_MAX_RETRIES = 60
+    SVNSERVE_RETRY_DELAY = 0.05
+
+    UNKNOWN_SVN_COMMAND_RE = re.compile(br'unknown command [\'"]svn[\'"]',
+                                        re.I)
+
+    #: MD5 digests of the diffs generated in the tests.
+    DIFF_FOO4_MD5 = unhexlify(b'2eb0a5f2149232c43a1745d90949fcd5')
+    DIFF_FOO6_MD5 = unhexlify(b'3d007394de3831d61e477cbcfe60ece8')
 
     hg_env = {'FOO': 'BAR'}
 
@@ -886,14 +1280,18 @@ class MercurialSubversionClientTests(MercurialTestBase):
         super(MercurialSubversionClientTests, cls).setUpClass()
 
         for exe in ('svnadmin', 'svnserve', 'svn'):
-            if not is_exe_in_path(exe):
+            if not _is_exe_in_path(exe):
                 raise SkipTest('%s is not available on the system. Skipping.'
                                % exe)
 
         cls._has_hgsubversion = None
+        cls._hgsvn_template_dir = None
 
         # Create the repository that we'll be populating and later cloning.
-        temp_base_path = tempfile.mkdtemp(prefix='rbtools.')
+        # This goes on the same filesystem as the per-test temp directories,
+        # so that copies of the hgsubversion clone can hardlink its store.
+        temp_base_path = tempfile.mkdtemp(prefix='rbtools.',
+                                          dir=_get_shm_tempdir())
         cls._svn_temp_base_path = temp_base_path
 
         svn_repo_path = os.path.join(temp_base_path, 'svnrepo')
@@ -917,23 +1315,36 @@ class MercurialSubversionClientTests(MercurialTestBase):
                                     msg='Test commit %s' % i,
                                     add_file=(i == 0))
 
-        # Launch svnserve so Mercurial can pull from it.
-        cls._svnserve_pid = None
+        # Launch svnserve so Mercurial can pull from it. It's kept in the
+        # foreground so we own the process, and is ready once it accepts
+        # connections.
         svnserve_port = (os.environ.get('SVNSERVE_PORT') or
-                         str(randint(30000, 40000)))
+                         str(cls._get_free_port()))
+
+        cls._svnserve = subprocess.Popen(
+            ['svnserve', '--single-thread', '-d', '--foreground',
+             '--listen-port', svnserve_port, '-r', temp_base_path],
+            close_fds=True)
 
-        pid_file = os.path.join(temp_base_path, 'svnserve.pid')
-        execute(['svnserve', '--single-thread', '--pid-file', pid_file, '-d',
-                 '--listen-port', svnserve_port, '-r', temp_base_path])
+        ready = False
 
         for i in range(0, cls.SVNSERVE_MAX_RETRIES):
+            if cls._svnserve.poll() is not None:
+                # svnserve exited early (for instance, the port is in use).
+                break
+
             try:
-                cls._svnserve_pid = int(open(pid_file).read().strip())
-            except (IOError, OSError):
+                socket.create_connection(('127.0.0.1', int(svnserve_port)),
+                                         timeout=1).close()
+                ready = True
+                break
+            except socket.error:
                 # Wait to see if svnserve has launched yet.
-                time.sleep(0.25)
+                time.sleep(cls.SVNSERVE_RETRY_DELAY)
 
-        if not cls._svnserve_pid:
+        if not ready:
+            cls._stop_svnserve()
+            shutil.rmtree(temp_base_path, ignore_errors=True)
             raise cls.failureException('Unable to launch svnserve on port %s'
                                        % svnserve_port)
 
@@ -941,15 +1352,13 @@ class MercurialSubversionClientTests(MercurialTestBase):
 
     @classmethod
     def tearDownClass(cls):
-        if cls._svnserve_pid:
-            os.kill(cls._svnserve_pid, 9)
+        cls._stop_svnserve()
 
         shutil.rmtree(cls._svn_temp_base_path, ignore_errors=True)
 
         super(MercurialSubversionClientTests, cls).tearDownClass()
 
     def setUp(self):
-        print(os.getcwd())
         super(MercurialSubversionClientTests, self).setUp()
 
         # Make sure hgsubversion is enabled.
@@ -969,17 +1378,59 @@ class MercurialSubversionClientTests(MercurialTestBase):
             raise SkipTest('hgsubversion is not available or cannot be used. '
                            'Skipping.')
 
-        try:
-            self.clone_dir = os.path.join(home_dir, 'checkout.hg')
-            self.run_hg(['clone', '--stream', self.svn_checkout_url,
-                         self.clone_dir])
-        except (OSError, IOError) as e:
-            self.fail('Unable to clone Subversion repository: %s' % e)
+        # The Subversion repository doesn't change between tests, so it's
+        # only cloned once. Each test gets its own copy of that clone.
+        cls = type(self)
+
+        if cls._hgsvn_template_dir is None:
+            template_dir = os.path.join(cls._svn_temp_base_path,
+                                        'checkout.hg')
+
+            try:
+                self.run_hg(['clone', '--stream', self.svn_checkout_url,
+                             template_dir])
+            except (OSError, IOError) as e:
+                self.fail('Unable to clone Subversion repository: %s' % e)
+
+            cls._hgsvn_template_dir = template_dir
+
+        self.clone_dir = os.path.join(home_dir, 'checkout.hg')
+        _copy_hg_clone(self._hgsvn_template_dir, self.clone_dir)
 
         os.chdir(self.clone_dir)
         self.options.parent_branch = None
         self.client = MercurialClient(options=self.options)
 
+    @classmethod
+    def _get_free_port(cls):
+        """Return a local TCP port that is not currently in use.
+
+        Letting the OS pick the port avoids collisions between test runs
+        happening in parallel, which a random choice can't guarantee.
+
+        Returns:
+            int:
+            The port number.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        try:
+            sock.bind(('127.0.0.1', 0))
+
+            return sock.getsockname()[1]
+        finally:
+            sock.close()
+
+    @classmethod
+    def _stop_svnserve(cls):
+        """Stop the svnserve process, if running."""
+        if cls._svnserve is not None:
+            if cls._svnserve.poll() is None:
+                cls._svnserve.kill()
+
+            cls._svnserve.wait()
+            cls._svnserve = None
+
     @property
     def has_hgsubversion(self):
         """Whether hgsubversion is installed and usable."""
@@ -991,8 +1442,7 @@ class MercurialSubversionClientTests(MercurialTestBase):
                 output = self.run_hg(['svn', '--help'], ignore_errors=True,
                                       extra_ignore_errors=(255))
                 has_hgsubversion = \
-                    not re.search(b'unknown command [\'"]svn[\'"]',
-                                  output, re.I)
+                    not self.UNKNOWN_SVN_COMMAND_RE.search(output)
             except OSError:
                 has_hgsubversion = False
 
@@ -1068,8 +1518,8 @@ class MercurialSubversionClientTests(MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '2eb0a5f2149232c43a1745d90949fcd5')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO4_MD5)
         self.assertIsNone(result['parent_diff'])
 
     def test_diff_with_multiple_commits(self):
@@ -1091,8 +1541,8 @@ class MercurialSubversionClientTests(MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '3d007394de3831d61e477cbcfe60ece8')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO6_MD5)
         self.assertIsNone(result['parent_diff'])
 
     def test_diff_with_revision(self):
@@ -1121,6 +1571,6 @@ class MercurialSubversionClientTests(MercurialTestBase):
 
         self.assertIsInstance(result, dict)
         self.assertIn('diff', result)
-        self.assertEqual(md5(result['diff']).hexdigest(),
-                         '2eb0a5f2149232c43a1745d90949fcd5')
+        self.assertEqual(_diff_md5(result['diff']),
+                         self.DIFF_FOO4_MD5)
         self.assertIsNone(result['parent_diff'])
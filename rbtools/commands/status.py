@@ -2,7 +2,9 @@ from __future__ import print_function, unicode_literals
 
 import logging
 import re
+import sys
 
+import six
 import texttable as tt
 try:
     from backports.shutil_get_terminal_size import get_terminal_size
@@ -14,6 +16,20 @@ from rbtools.utils.repository import get_repository_id
 from rbtools.utils.users import get_username
 
 
+def _decode_hex_escape(m):
+    """Return the character for a ``\\xXX`` escape in a format string.
+
+    Args:
+        m (re.MatchObject):
+            The match for the escape, with the hex code as the first group.
+
+    Returns:
+        unicode:
+        The decoded character.
+    """
+    return six.unichr(int(m.group(1), 16))
+
+
 class Status(Command):
     """Display review requests for the current repository."""
 
@@ -57,22 +73,39 @@ class Status(Command):
     # The number of spaces after the end of the request's summary.
     PADDING = 5
 
-    _HEX_RE = re.compile(r'\\x([0-9a-fA-f]{2})')
+    _HEX_RE = re.compile(r'\\x([0-9a-fA-F]{2})')
 
     def tabulate(self, review_requests):
         """Print review request summary and status in a table.
 
+        If standard output isn't a terminal, each review request is instead
+        printed as a tab-separated line of its status, ``r/<id> - <summary>``,
+        branch, and bookmark. The branch and bookmark are empty if unset.
+
         Args:
             review_requests (list of dict):
                 A list that contains statistics about each review request.
         """
-        if len(review_requests):
+        if review_requests:
+            if not sys.stdout.isatty():
+                # The output is being piped or redirected, so skip laying out
+                # a table and write one tab-separated line per review request.
+                # Every line has the same columns, so that scripts can rely
+                # on them.
+                sys.stdout.write(''.join(
+                    '%s\n' % '\t'.join([
+                        info['status'],
+                        'r/%s - %s' % (info['id'], info['summary']),
+                        info.get('branch') or '',
+                        info.get('bookmark') or '',
+                    ])
+                    for info in review_requests
+                ))
+                return
+
             has_branches = False
             has_bookmarks = False
 
-            table = tt.Texttable(get_terminal_size().columns)
-            header = ['Status', 'Review Request']
-
             for info in review_requests:
                 if 'branch' in info:
                     has_branches = True
@@ -80,13 +113,7 @@ class Status(Command):
                 if 'bookmark' in info:
                     has_bookmarks = True
 
-            if has_branches:
-                header.append('Branch')
-
-            if has_bookmarks:
-                header.append('Bookmark')
-
-            table.header(header)
+            rows = []
 
             for info in review_requests:
                 row = [
@@ -100,7 +127,19 @@ class Status(Command):
                 if has_bookmarks:
                     row.append(info.get('bookmark') or '')
 
-                table.add_row(row)
+                rows.append(row)
+
+            table = tt.Texttable(get_terminal_size().columns)
+            header = ['Status', 'Review Request']
+
+            if has_branches:
+                header.append('Branch')
+
+            if has_bookmarks:
+                header.append('Bookmark')
+
+            table.header(header)
+            table.add_rows(rows, header=False)
 
             print(table.draw())
         else:
@@ -108,25 +147,35 @@ class Status(Command):
 
         print()
 
-    def get_data(self, requests):
+    def get_data(self, requests, include_description=True):
         """Return current status and review summary for all reviews.
 
         Args:
             requests (ListResource):
                 A ListResource that contains data on all open/draft requests.
 
+            include_description (bool, optional):
+                Whether to include each review request's description.
+
         Returns:
             list: A list whose elements are dicts of each request's statistics.
         """
         requests_stats = []
 
         for request in requests.all_items:
+            # Each access to a field on a resource goes through __getattr__
+            # and wraps the value again, so fetch the ones used more than
+            # once up front.
+            issue_open_count = request.issue_open_count
+            ship_it_count = request.ship_it_count
+            extra_data = request.extra_data
+
             if request.draft:
                 status = 'Draft'
-            elif request.issue_open_count:
-                status = 'Open Issues (%s)' % request.issue_open_count
-            elif request.ship_it_count:
-                status = 'Ship It! (%s)' % request.ship_it_count
+            elif issue_open_count:
+                status = 'Open Issues (%s)' % issue_open_count
+            elif ship_it_count:
+                status = 'Ship It! (%s)' % ship_it_count
             else:
                 status = 'Pending'
 
@@ -134,15 +183,15 @@ class Status(Command):
                 'id':  request.id,
                 'status': status,
                 'summary': request.summary,
-                'description': request.description,
             }
 
-            if 'local_branch' in request.extra_data:
-                info['branch'] = \
-                    request.extra_data['local_branch']
-            elif 'local_bookmark' in request.extra_data:
-                info['bookmark'] = \
-                    request.extra_data['local_bookmark']
+            if include_description:
+                info['description'] = request.description
+
+            if 'local_branch' in extra_data:
+                info['branch'] = extra_data['local_branch']
+            elif 'local_bookmark' in extra_data:
+                info['bookmark'] = extra_data['local_bookmark']
 
             requests_stats.append(info)
 
@@ -159,10 +208,33 @@ class Status(Command):
         # Check if repository info on reviewboard server match local ones.
         repository_info = repository_info.find_server_repository_info(api_root)
 
+        if self.options.format:
+            fmt = self._HEX_RE.sub(_decode_hex_escape, self.options.format)
+        else:
+            fmt = None
+
+        # Descriptions can be large, and are only shown if the format asks
+        # for them, so only fetch them when needed.
+        include_description = fmt is not None and 'description' in fmt
+
+        only_fields = [
+            'id', 'summary', 'draft', 'issue_open_count', 'ship_it_count',
+            'extra_data',
+        ]
+
+        if include_description:
+            only_fields.append('description')
+
         query_args = {
             'from_user': username,
             'status': 'pending',
             'expand': 'draft',
+            'only_fields': ','.join(only_fields),
+            'only_links': 'draft',
+
+            # Fetch as many review requests per page as the API allows,
+            # rather than the default of 25, to cut down on round-trips.
+            'max_results': 200,
         }
 
         if not self.options.all_repositories:
@@ -180,29 +252,37 @@ class Status(Command):
                                 'requests from all repositories.')
 
         review_requests = api_root.get_review_requests(**query_args)
-        review_request_info = self.get_data(review_requests)
+        review_request_info = self.get_data(
+            review_requests,
+            include_description=include_description)
 
-        if self.options.format:
-            self.format_results(review_request_info)
+        if fmt:
+            self.format_results(review_request_info, fmt)
         else:
             self.tabulate(review_request_info)
 
-    def format_results(self, review_requests):
+    def format_results(self, review_requests, fmt):
         """Print formatted information about the review requests.
 
         Args:
             review_requests (list of dict):
                 The information about the review requests.
-        """
-        fmt = self._HEX_RE.sub(
-            lambda m: chr(int(m.group(1), 16)),
-            self.options.format,
-        )
 
+            fmt (unicode):
+                The format string to print each review request with, with
+                any character escapes already decoded.
+        """
         if self.options.format_nul:
             end = '\x00'
         else:
             end = '\n'
 
+        # Output is collected and written in one go, rather than a line at a
+        # time.
+        chunks = []
+
         for info in review_requests:
-            print(fmt % info, end=end)
+            chunks.append(fmt % info)
+            chunks.append(end)
+
+        sys.stdout.write(''.join(chunks))
@@ -0,0 +1,189 @@
+"""Test for RBTools status command."""
+
+from __future__ import unicode_literals
+
+import sys
+
+import six
+from kgb import SpyAgency
+
+from rbtools.clients import RepositoryInfo
+from rbtools.commands import status as status_module
+from rbtools.commands.status import Status
+from rbtools.utils.testbase import RBTestBase
+
+
+class _TTYStringIO(six.StringIO):
+    """A string buffer that claims to be a terminal."""
+
+    def isatty(self):
+        return True
+
+
+class _ReviewRequestStub(object):
+    """A stand-in for a review request item resource."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class _ReviewRequestListStub(object):
+    """A stand-in for a review request list resource."""
+
+    def __init__(self, review_requests):
+        self.all_items = review_requests
+
+
+class _RootResourceStub(object):
+    """A stand-in for the API root, recording review request queries."""
+
+    def __init__(self):
+        self.query_args = None
+
+    def get_review_requests(self, **query_args):
+        self.query_args = query_args
+
+        return _ReviewRequestListStub([])
+
+
+class StatusCommandTests(SpyAgency, RBTestBase):
+    """Tests for rbt status command."""
+
+    review_requests = [
+        {
+            'id': 1,
+            'status': 'Pending',
+            'summary': 'Summary 1',
+        },
+        {
+            'id': 2,
+            'status': 'Draft',
+            'summary': 'Summary 2',
+            'bookmark': 'my-bookmark',
+        },
+    ]
+
+    def test_tabulate_not_tty(self):
+        """Testing rbt status output when standard output isn't a terminal"""
+        output = self.catch_output(
+            lambda: Status().tabulate(self.review_requests))
+
+        self.assertEqual(
+            output,
+            'Pending\tr/1 - Summary 1\t\t\n'
+            'Draft\tr/2 - Summary 2\t\tmy-bookmark\n')
+
+    def test_tabulate_tty(self):
+        """Testing rbt status output when standard output is a terminal"""
+        stdout = sys.stdout
+        sys.stdout = _TTYStringIO()
+
+        try:
+            Status().tabulate(self.review_requests)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+        self.assertIn('Status', output)
+        self.assertIn('Review Request', output)
+        self.assertIn('Bookmark', output)
+        self.assertNotIn('Branch', output)
+        self.assertIn('r/1 - Summary 1', output)
+        self.assertIn('r/2 - Summary 2', output)
+        self.assertIn('my-bookmark', output)
+        self.assertNotIn('\t', output)
+
+    def test_get_data(self):
+        """Testing rbt status collecting review request information"""
+        review_requests = _ReviewRequestListStub([
+            _ReviewRequestStub(id=1,
+                               summary='Summary 1',
+                               description='Description 1',
+                               draft=None,
+                               issue_open_count=2,
+                               ship_it_count=0,
+                               extra_data={'local_branch': 'my-branch'}),
+        ])
+
+        self.assertEqual(
+            Status().get_data(review_requests),
+            [{
+                'id': 1,
+                'status': 'Open Issues (2)',
+                'summary': 'Summary 1',
+                'description': 'Description 1',
+                'branch': 'my-branch',
+            }])
+
+    def test_get_data_without_description(self):
+        """Testing rbt status collecting review request information without
+        descriptions
+        """
+        review_requests = _ReviewRequestListStub([
+            _ReviewRequestStub(id=1,
+                               summary='Summary 1',
+                               draft=None,
+                               issue_open_count=0,
+                               ship_it_count=1,
+                               extra_data={}),
+        ])
+
+        self.assertEqual(
+            Status().get_data(review_requests, include_description=False),
+            [{
+                'id': 1,
+                'status': 'Ship It! (1)',
+                'summary': 'Summary 1',
+            }])
+
+    def test_only_fields(self):
+        """Testing rbt status fetching only the fields it needs"""
+        api_root = self._run_status_command([])
+
+        self.assertEqual(
+            api_root.query_args['only_fields'],
+            'id,summary,draft,issue_open_count,ship_it_count,extra_data')
+
+    def test_only_fields_with_description_format(self):
+        """Testing rbt status fetching descriptions when --format uses them"""
+        api_root = self._run_status_command(
+            ['--format', '%(id)s\\x09%(description)s'])
+
+        self.assertEqual(
+            api_root.query_args['only_fields'],
+            'id,summary,draft,issue_open_count,ship_it_count,extra_data,'
+            'description')
+
+    def _run_status_command(self, args):
+        """Run rbt status against a stubbed Review Board server.
+
+        Args:
+            args (list of unicode):
+                Command line arguments to pass to :command:`rbt status`.
+
+        Returns:
+            _RootResourceStub:
+            The API root, holding the review request query that was made.
+        """
+        status = Status()
+        argv = ['rbt', 'status', '--all'] + args
+        parser = status.create_arg_parser(argv)
+        status.options = parser.parse_args(argv[2:])
+
+        api_root = _RootResourceStub()
+
+        self.spy_on(status.initialize_scm_tool,
+                    call_fake=lambda *args, **kwargs: (RepositoryInfo(),
+                                                       None))
+        self.spy_on(status.get_server_url,
+                    call_fake=lambda *args, **kwargs: 'http://localhost/')
+        self.spy_on(status.get_api,
+                    call_fake=lambda *args, **kwargs: (None, api_root))
+        self.spy_on(status.setup_tool,
+                    call_fake=lambda *args, **kwargs: None)
+        self.spy_on(status_module.get_username,
+                    call_fake=lambda *args, **kwargs: 'user')
+
+        self.catch_output(status.main)
+
+        return api_root